@@ -84,6 +84,20 @@ def cli():
     is_flag=True,
     help="Warn if detected BPM differs from filename",
 )
+@click.option(
+    "--warn-fraction",
+    type=click.FloatRange(0, 1),
+    default=1.0,
+    show_default=True,
+    help="Fraction of files to run detection on for --warn (cached results are always checked)",
+)
+@click.option(
+    "--detector",
+    type=click.Choice(["librosa", "fast"]),
+    default="librosa",
+    show_default=True,
+    help="BPM detection method (fast skips librosa but is more prone to half/double time)",
+)
 @click.option(
     "--crispness",
     type=click.IntRange(0, 6),
@@ -91,6 +105,12 @@ def cli():
     show_default=True,
     help="Rubberband crispness (0-6, higher preserves transients)",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    help="Number of parallel jobs (default: CPU count)",
+)
 def stretch(
     input_path: Path,
     target: float | None,
@@ -103,7 +123,10 @@ def stretch(
     bit_depth: str | None,
     mono: bool,
     warn: bool,
+    warn_fraction: float,
+    detector: str,
     crispness: int,
+    jobs: int | None,
 ):
     """
     Time-stretch audio file(s) to target BPM(s).
@@ -124,6 +147,9 @@ def stretch(
         # Batch process directory
         breaks-machine stretch ./breaks/ --target 140
 
+        # Batch process with 4 parallel jobs
+        breaks-machine stretch ./breaks/ --target 140 --jobs 4
+
         # With format conversion
         breaks-machine stretch break.wav -t 140 --sample-rate 44100 --mono
     """
@@ -146,7 +172,10 @@ def stretch(
         bit_depth=int(bit_depth) if bit_depth else None,
         mono=mono,
         warn=warn,
+        warn_fraction=warn_fraction,
+        detector=detector,
         crispness=crispness,
+        jobs=jobs,
     )
 
     click.echo(f"Target BPM(s): {', '.join(str(int(t)) for t in target_bpms)}")
@@ -1,10 +1,21 @@
 """Audio format conversion utilities."""
 
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
 from pathlib import Path
+from typing import BinaryIO
 
 import numpy as np
 import soundfile as sf
 
+# Frames read per block when streaming conversions
+BLOCK_SIZE = 65536
+
+# soxr quality preset for all resampling (libsoxr's own default)
+RESAMPLE_QUALITY = "HQ"
+
 # Map bit depth to soundfile subtype
 BIT_DEPTH_TO_SUBTYPE = {
     16: "PCM_16",
@@ -13,6 +24,36 @@ BIT_DEPTH_TO_SUBTYPE = {
 }
 
 
+@dataclass
+class DecodedAudio:
+    """Audio samples decoded once for reuse, with their source format."""
+
+    samples: np.ndarray
+    sample_rate: int
+    subtype: str
+    format: str
+
+
+def read_audio(file_path: Path | BinaryIO) -> DecodedAudio:
+    """
+    Decode an audio file to float32 samples.
+
+    Args:
+        file_path: Path to audio file, or an open binary file object
+
+    Returns:
+        Decoded audio as (frames, channels) with its sample rate and format
+    """
+    with sf.SoundFile(file_path) as f:
+        samples = f.read(dtype="float32", always_2d=True)
+        return DecodedAudio(
+            samples=samples,
+            sample_rate=f.samplerate,
+            subtype=f.subtype,
+            format=f.format,
+        )
+
+
 def convert_audio(
     input_path: Path,
     output_path: Path | None = None,
@@ -36,50 +77,141 @@ def convert_audio(
     if output_path is None:
         output_path = input_path
 
-    # Load audio
-    y, sr = sf.read(input_path)
-    input_info = sf.info(input_path)
+    # One handle serves both the header checks and the streamed read
+    with sf.SoundFile(input_path) as src:
+        sr = src.samplerate
+        channels = src.channels
+
+        # Requested values that already match the input are no-ops
+        resample = sample_rate is not None and sample_rate != sr
+        downmix = mono and channels > 1
+        subtype = subtype_for_bit_depth(bit_depth, src.subtype)
+        requantize = subtype != src.subtype
+
+        # Only write if conversion was needed or output path differs
+        if not (resample or downmix or requantize or output_path != input_path):
+            return output_path
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        out_rate = sample_rate if resample else sr
+        out_channels = 1 if downmix else channels
+
+        resampler = None
+        if resample:
+            # Use soxr for high-quality resampling (installed with librosa),
+            # streamed in blocks so memory use doesn't grow with file length
+            import soxr
+
+            resampler = soxr.ResampleStream(
+                sr, out_rate, out_channels, dtype="float32", quality=RESAMPLE_QUALITY
+            )
+
+        # Stream into a temporary file so the input can also be the output
+        with tempfile.NamedTemporaryFile(
+            dir=output_path.parent, suffix=output_path.suffix, delete=False
+        ) as tmp:
+            tmp_path = Path(tmp.name)
+
+        try:
+            with sf.SoundFile(
+                tmp_path,
+                "w",
+                samplerate=out_rate,
+                channels=out_channels,
+                subtype=subtype,
+            ) as out:
+                for block in src.blocks(blocksize=BLOCK_SIZE, dtype="float32", always_2d=True):
+                    # Downmix before resampling so only one channel is resampled
+                    if downmix:
+                        block = np.mean(block, axis=1, dtype=np.float32, keepdims=True)
+                    if resampler is not None:
+                        block = resampler.resample_chunk(block)
+                    out.write(block)
+
+                if resampler is not None:
+                    out.write(
+                        resampler.resample_chunk(
+                            np.zeros((0, out_channels), dtype=np.float32), last=True
+                        )
+                    )
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    # Replace only after the input is closed, in case it is the output.
+    # Temporary files are created owner-only, so carry over the permissions
+    # of the file being replaced (or of the input, for a new output).
+    try:
+        shutil.copymode(output_path if output_path.exists() else input_path, tmp_path)
+        os.replace(tmp_path, output_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return output_path
 
-    # Track if any conversion is needed
-    needs_conversion = False
 
+def convert_samples(
+    samples: np.ndarray,
+    sr: int,
+    sample_rate: int | None = None,
+    mono: bool = False,
+) -> tuple[np.ndarray, int]:
+    """
+    Resample and/or downmix decoded audio.
+
+    Args:
+        samples: Audio as (frames,) or (frames, channels)
+        sr: Sample rate of the audio in Hz
+        sample_rate: Target sample rate in Hz (e.g., 44100, 48000)
+        mono: Convert to mono if True
+
+    Returns:
+        Tuple of converted samples and their sample rate
+    """
     # Resample if needed
     if sample_rate is not None and sample_rate != sr:
-        needs_conversion = True
-        # Use soxr for high-quality resampling (installed with librosa)
+        # Use soxr for high-quality resampling (installed with librosa);
+        # it keeps the input dtype, so float32 stays float32
         import soxr
 
-        y = soxr.resample(y, sr, sample_rate)
+        samples = soxr.resample(samples, sr, sample_rate, quality=RESAMPLE_QUALITY)
         sr = sample_rate
 
     # Convert to mono if needed
-    if mono and len(y.shape) > 1 and y.shape[1] > 1:
-        needs_conversion = True
-        y = np.mean(y, axis=1)
-
-    # Determine output subtype
-    if bit_depth is not None:
-        needs_conversion = True
-        subtype = BIT_DEPTH_TO_SUBTYPE.get(bit_depth)
-        if subtype is None:
-            raise ValueError(f"Unsupported bit depth: {bit_depth}. Use 16, 24, or 32.")
-    else:
-        subtype = input_info.subtype
-
-    # Only write if conversion was needed or output path differs
-    if needs_conversion or output_path != input_path:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        sf.write(output_path, y, sr, subtype=subtype)
+    if mono and samples.ndim > 1 and samples.shape[1] > 1:
+        samples = np.mean(samples, axis=1, dtype=np.float32)
 
-    return output_path
+    return samples, sr
+
+
+def subtype_for_bit_depth(bit_depth: int | None, default: str) -> str:
+    """
+    Get the soundfile subtype for a target bit depth.
+
+    Args:
+        bit_depth: Target bit depth (16, 24, or 32), or None to keep default
+        default: Subtype to use when no bit depth is given
+
+    Returns:
+        soundfile subtype name
+
+    Raises:
+        ValueError: If the bit depth is not supported
+    """
+    if bit_depth is None:
+        return default
+    subtype = BIT_DEPTH_TO_SUBTYPE.get(bit_depth)
+    if subtype is None:
+        raise ValueError(f"Unsupported bit depth: {bit_depth}. Use 16, 24, or 32.")
+    return subtype
 
 
-def get_audio_info(file_path: Path) -> dict:
+def get_audio_info(file_path: Path | BinaryIO) -> dict:
     """
     Get audio file information.
 
     Args:
-        file_path: Path to audio file
+        file_path: Path to audio file, or an open binary file object
 
     Returns:
         Dictionary with audio properties
@@ -1,10 +1,51 @@
 """BPM detection from filenames and audio analysis."""
 
+import json
+import os
+import random
 import re
+import tempfile
 from collections.abc import Callable
 from pathlib import Path
 
-import librosa
+import numpy as np
+import soundfile as sf
+
+from .converter import RESAMPLE_QUALITY, DecodedAudio
+
+# Sample rate and maximum duration (seconds) used for tempo analysis
+ANALYSIS_SAMPLE_RATE = 22050
+ANALYSIS_DURATION = 30.0
+
+# Analysis settings for the fast detector: 11025 Hz mono, 1024-sample
+# frames every 128 samples (~86 onset frames per second)
+FAST_SAMPLE_RATE = 11025
+FAST_FRAME_SIZE = 1024
+FAST_HOP_SIZE = 128
+
+# Tempo range searched by the fast detector, and how many of its strongest
+# autocorrelation peaks are considered
+FAST_MIN_BPM = 40
+FAST_MAX_BPM = 240
+FAST_CANDIDATES = 4
+
+# Filename BPM patterns, tried in order of priority. Kept as separate
+# searches: folding them into one pattern still needs a scan per pattern to
+# keep this precedence, and benchmarks slower than three compiled searches.
+# Number followed by optional separator and "bpm", e.g. "140bpm", "140_BPM"
+_BPM_SUFFIX_RE = re.compile(r"(\d{2,3})[\s_-]?bpm", re.IGNORECASE)
+# 2-3 digit number at start followed by separator, e.g. "164_HT_Drums"
+_BPM_LEADING_RE = re.compile(r"^(\d{2,3})[\s_-]")
+# Separator followed by 2-3 digit number at end or before another separator,
+# e.g. "amen_170", "break-140"
+_BPM_TRAILING_RE = re.compile(r"[_-](\d{2,3})(?:[_-]|$)")
+
+# Bump when detection changes so stale cached results are discarded
+CACHE_VERSION = 4
+
+# Detections already seen by this process, by cache key, so repeat lookups
+# skip re-reading the cache file
+_memory_cache: dict[str, float] = {}
 
 
 class BPMDetectionError(Exception):
@@ -29,64 +70,23 @@ def parse_bpm_from_filename(file_path: Path) -> float | None:
     """
     filename = file_path.stem
 
-    # Pattern: number followed by optional separator and "bpm" (case insensitive)
-    # e.g., "140bpm", "140-bpm", "140_BPM", "140 bpm"
-    pattern_with_bpm = r"(\d{2,3})[\s_-]?bpm"
-    match = re.search(pattern_with_bpm, filename, re.IGNORECASE)
-    if match:
-        bpm = float(match.group(1))
-        if 90 <= bpm <= 180:
-            return bpm
-
-    # Pattern: 2-3 digit number at start followed by separator
-    # e.g., "164_HT_Drums", "120-break"
-    pattern_leading = r"^(\d{2,3})[\s_-]"
-    match = re.match(pattern_leading, filename)
-    if match:
-        bpm = float(match.group(1))
-        if 90 <= bpm <= 180:
-            return bpm
-
-    # Pattern: underscore/hyphen followed by 2-3 digit number at end or before extension
-    # e.g., "amen_170", "break-140"
-    pattern_trailing = r"[_-](\d{2,3})(?:[_-]|$)"
-    match = re.search(pattern_trailing, filename)
-    if match:
-        bpm = float(match.group(1))
-        if 90 <= bpm <= 180:
-            return bpm
+    for pattern in (_BPM_SUFFIX_RE, _BPM_LEADING_RE, _BPM_TRAILING_RE):
+        match = pattern.search(filename)
+        if match:
+            bpm = float(match.group(1))
+            if 90 <= bpm <= 180:
+                return bpm
 
     return None
 
 
-def detect_bpm_with_librosa(file_path: Path) -> float:
+def _choose_bpm(all_candidates: list[float]) -> float:
     """
-    Detect BPM using librosa's beat tracking with multiple strategies.
-
-    Uses multiple tempo priors and subdivision correction to improve accuracy
-    on complex breakbeats.
+    Pick the most plausible breakbeat tempo from raw tempo candidates.
 
-    Returns the estimated BPM.
+    Considers common subdivisions of each candidate, then prefers direct
+    detections closest to the common breakbeat range.
     """
-    y, sr = librosa.load(file_path, sr=None)
-
-    # Strategy 1: Try multiple starting priors
-    # Default (120), medium (140), and high (170) to cover different tempo ranges
-    priors = [None, 140, 170]
-    all_candidates = []
-
-    for prior in priors:
-        if prior is None:
-            tempo = librosa.feature.tempo(y=y, sr=sr, aggregate=None)
-        else:
-            tempo = librosa.feature.tempo(y=y, sr=sr, start_bpm=prior, aggregate=None)
-
-        # Extract candidates
-        if hasattr(tempo, "__len__") and len(tempo) > 0:
-            all_candidates.extend([float(t) for t in tempo[:4]])
-        else:
-            all_candidates.append(float(tempo))
-
     # Remove duplicates
     candidates = sorted(set(all_candidates))
 
@@ -124,6 +124,233 @@ def detect_bpm_with_librosa(file_path: Path) -> float:
         return best
 
 
+def detect_bpm_with_librosa(file_path: Path, audio: DecodedAudio | None = None) -> float:
+    """
+    Detect BPM using librosa's beat tracking with multiple strategies.
+
+    Uses multiple tempo priors and subdivision correction to improve accuracy
+    on complex breakbeats.
+
+    Args:
+        file_path: Path to audio file
+        audio: Already-decoded contents of the file, to avoid decoding it again
+
+    Returns the estimated BPM.
+    """
+    # Imported lazily: librosa takes seconds to import and isn't needed when
+    # the BPM comes from --bpm, the filename, or the detection cache
+    import librosa
+
+    # Tempo estimation gains nothing from full-rate audio, so analyse mono
+    # at 22050 Hz to halve the FFT work. Break tempos are stationary, so the
+    # opening seconds are enough and the rest of the file is never decoded.
+    if audio is not None:
+        head = audio.samples[: int(ANALYSIS_DURATION * audio.sample_rate)]
+        y = librosa.resample(
+            np.mean(head, axis=1, dtype=np.float32),
+            orig_sr=audio.sample_rate,
+            target_sr=ANALYSIS_SAMPLE_RATE,
+        )
+        sr = ANALYSIS_SAMPLE_RATE
+    else:
+        y, sr = librosa.load(
+            file_path,
+            sr=ANALYSIS_SAMPLE_RATE,
+            mono=True,
+            duration=ANALYSIS_DURATION,
+            dtype=np.float32,
+        )
+
+    # The onset envelope (STFT + spectral flux) dominates the cost, so
+    # compute it once and share it between all tempo priors
+    onset_env = librosa.onset.onset_strength(y=y, sr=sr)
+
+    # Strategy 1: Try multiple starting priors
+    # Default (120), medium (140), and high (170) to cover different tempo ranges
+    priors = [None, 140, 170]
+    all_candidates = []
+
+    for prior in priors:
+        kwargs = {"onset_envelope": onset_env, "sr": sr, "aggregate": None}
+        if prior is not None:
+            kwargs["start_bpm"] = prior
+        tempo = librosa.feature.tempo(**kwargs)
+
+        # Extract candidates
+        if hasattr(tempo, "__len__") and len(tempo) > 0:
+            all_candidates.extend([float(t) for t in tempo[:4]])
+        else:
+            all_candidates.append(float(tempo))
+
+    # Strategies 2 and 3: subdivision correction and choice of candidate
+    return _choose_bpm(all_candidates)
+
+
+def detect_bpm_fast(file_path: Path, audio: DecodedAudio | None = None) -> float:
+    """
+    Detect BPM from the autocorrelation of a spectral-flux onset envelope.
+
+    Much cheaper than detect_bpm_with_librosa (no librosa import, one small
+    STFT, one FFT autocorrelation). The strongest periods go through the same
+    subdivision correction, but without librosa's tempo priors it is more
+    likely to land on half or double time.
+
+    Args:
+        file_path: Path to audio file
+        audio: Already-decoded contents of the file, to avoid decoding it again
+
+    Returns the estimated BPM, between 80 and 200.
+
+    Raises:
+        BPMDetectionError: If the audio has no periodic onsets in range.
+    """
+    # soxr is installed with librosa but far quicker to import
+    import soxr
+
+    if audio is not None:
+        samples = audio.samples[: int(ANALYSIS_DURATION * audio.sample_rate)]
+        sr = audio.sample_rate
+    else:
+        with sf.SoundFile(file_path) as f:
+            sr = f.samplerate
+            samples = f.read(int(ANALYSIS_DURATION * sr), dtype="float32", always_2d=True)
+
+    y = soxr.resample(
+        np.mean(samples, axis=1, dtype=np.float32), sr, FAST_SAMPLE_RATE, quality=RESAMPLE_QUALITY
+    )
+
+    # The onset envelope needs a few frames to have any change to measure
+    if len(y) < FAST_FRAME_SIZE + 3 * FAST_HOP_SIZE:
+        raise BPMDetectionError(f"Audio too short to detect tempo in {file_path}")
+
+    # Onset envelope: positive change in log magnitude between frames
+    frames = np.lib.stride_tricks.sliding_window_view(y, FAST_FRAME_SIZE)[::FAST_HOP_SIZE]
+    window = np.hanning(FAST_FRAME_SIZE).astype(np.float32)
+    magnitude = np.log1p(np.abs(np.fft.rfft(frames * window, axis=1)))
+    onset_env = np.maximum(np.diff(magnitude, axis=0), 0).sum(axis=1)
+    onset_env -= onset_env.mean()
+
+    # Autocorrelation via FFT, zero-padded so it doesn't wrap around
+    n_fft = 2 * len(onset_env)
+    autocorr = np.fft.irfft(np.abs(np.fft.rfft(onset_env, n_fft)) ** 2, n_fft)
+
+    # Beat periods are the autocorrelation peaks within the lag window.
+    # A maximum on the window edge is just the slope of a peak outside it,
+    # so only peaks strictly inside count.
+    frame_rate = FAST_SAMPLE_RATE / FAST_HOP_SIZE
+    min_lag = int(60 * frame_rate / FAST_MAX_BPM)
+    max_lag = min(int(np.ceil(60 * frame_rate / FAST_MIN_BPM)), len(onset_env) - 2)
+    lags = np.arange(min_lag + 1, max_lag)
+    window = autocorr[lags]
+    is_peak = (window > autocorr[lags - 1]) & (window >= autocorr[lags + 1]) & (window > 0)
+    peak_lags = lags[is_peak]
+    if len(peak_lags) == 0:
+        raise BPMDetectionError(f"No tempo found in {file_path}")
+
+    # The strongest peaks become tempo candidates, each refined between
+    # frames with a parabola through the peak
+    candidates = []
+    for lag in peak_lags[np.argsort(autocorr[peak_lags])[::-1][:FAST_CANDIDATES]]:
+        before, peak, after = autocorr[lag - 1 : lag + 2]
+        curvature = before - 2 * peak + after
+        offset = 0.5 * (before - after) / curvature if curvature < 0 else 0.0
+        candidates.append(60 * frame_rate / (lag + offset))
+
+    # Same subdivision correction as librosa detection
+    return float(_choose_bpm(candidates))
+
+
+# Detection methods selectable with --detector
+DETECTORS: dict[str, Callable[[Path, DecodedAudio | None], float]] = {
+    "librosa": detect_bpm_with_librosa,
+    "fast": detect_bpm_fast,
+}
+
+
+def get_cache_path() -> Path:
+    """Return the path of the on-disk BPM detection cache."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "breaks-machine" / "bpm.json"
+
+
+def _cache_key(file_path: Path, detector: str) -> str:
+    """Build a cache key that changes whenever the file is modified."""
+    stat = file_path.stat()
+    return f"{file_path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}:{detector}"
+
+
+def _load_cache(cache_path: Path) -> dict[str, float]:
+    """Load cached detections, treating a missing or unreadable cache as empty."""
+    try:
+        data = json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return {}
+    return data.get("entries", {})
+
+
+def _store_cache(cache_path: Path, key: str, bpm: float) -> None:
+    """Add an entry to the cache, replacing the file atomically."""
+    # Re-read so entries written by concurrent workers are kept
+    entries = _load_cache(cache_path)
+    entries[key] = bpm
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=cache_path.parent, suffix=".tmp", delete=False
+        ) as f:
+            json.dump({"version": CACHE_VERSION, "entries": entries}, f)
+        os.replace(f.name, cache_path)
+    except OSError:
+        # Caching is best-effort
+        pass
+
+
+def detect_bpm_cached(
+    file_path: Path,
+    audio: DecodedAudio | None = None,
+    detector: str = "librosa",
+) -> float:
+    """
+    Detect BPM, reusing results cached on disk.
+
+    Results are keyed by path, size, modification time, and detector, so
+    editing or replacing a file triggers a fresh detection.
+
+    Args:
+        file_path: Path to audio file
+        audio: Already-decoded contents of the file, to avoid decoding it again
+        detector: Detection method, a key of DETECTORS
+
+    Returns the estimated BPM.
+    """
+    cached = get_cached_bpm(file_path, detector)
+    if cached is not None:
+        return cached
+
+    bpm = DETECTORS[detector](file_path, audio)
+    key = _cache_key(file_path, detector)
+    _memory_cache[key] = bpm
+    _store_cache(get_cache_path(), key, bpm)
+    return bpm
+
+
+def get_cached_bpm(file_path: Path, detector: str = "librosa") -> float | None:
+    """
+    Look up a previously detected BPM without running detection.
+
+    Returns None if the file has no up-to-date cache entry.
+    """
+    key = _cache_key(file_path, detector)
+    bpm = _memory_cache.get(key)
+    if bpm is None:
+        bpm = _load_cache(get_cache_path()).get(key)
+        if bpm is not None:
+            _memory_cache[key] = bpm
+    return bpm
+
+
 def bpms_match(bpm1: float, bpm2: float, tolerance: float = 3.0) -> bool:
     """
     Check if two BPMs match, accounting for 2x/0.5x detection differences.
@@ -156,6 +383,9 @@ def get_source_bpm(
     manual_bpm: float | None = None,
     warn: bool = False,
     warn_callback: Callable[[str], None] | None = None,
+    warn_fraction: float = 1.0,
+    audio: DecodedAudio | None = None,
+    detector: str = "librosa",
 ) -> float:
     """
     Determine source BPM using priority: manual > filename > auto-detect.
@@ -165,6 +395,10 @@ def get_source_bpm(
         manual_bpm: User-specified BPM override (highest priority)
         warn: Whether to warn if detected BPM differs from filename
         warn_callback: Function to call with warning message
+        warn_fraction: Chance of running detection to validate a filename BPM
+            when warn is set (cached detections are always checked)
+        audio: Already-decoded contents of the file, to avoid decoding it again
+        detector: Detection method, a key of DETECTORS
 
     Returns:
         Detected or specified BPM
@@ -181,12 +415,19 @@ def get_source_bpm(
 
     # 3. Auto-detect as fallback (or for validation)
     detected_bpm = None
-    if filename_bpm is None or warn:
+    if filename_bpm is None:
         try:
-            detected_bpm = detect_bpm_with_librosa(file_path)
+            detected_bpm = detect_bpm_cached(file_path, audio, detector)
         except Exception as e:
-            if filename_bpm is None:
-                raise BPMDetectionError(f"Could not determine BPM for {file_path}: {e}") from e
+            raise BPMDetectionError(f"Could not determine BPM for {file_path}: {e}") from e
+    elif warn:
+        # Validating is free when cached, so only sample files needing detection
+        detected_bpm = get_cached_bpm(file_path, detector)
+        if detected_bpm is None and random.random() < warn_fraction:
+            try:
+                detected_bpm = detect_bpm_cached(file_path, audio, detector)
+            except Exception:
+                pass
 
     # Return filename BPM if available
     if filename_bpm is not None:
@@ -1,17 +1,24 @@
 """Pipeline orchestration for processing drum breaks."""
 
+import os
 import re
 from collections.abc import Callable
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, replace
 from pathlib import Path
 
-from .converter import convert_audio
+from .converter import convert_audio, read_audio
 from .detector import get_source_bpm
-from .stretcher import stretch_to_bpm
+from .stretcher import load_librubberband, stretch_array_to_bpm, stretch_to_bpm
 
 # Supported audio extensions
 SUPPORTED_EXTENSIONS = {".wav", ".flac"}
 
+# BPM suffix such as "140bpm", "-140-bpm", "_140_BPM"
+_BPM_SUFFIX_RE = re.compile(r"[\s_-]?(\d{2,3})[\s_-]?bpm", re.IGNORECASE)
+# Trailing underscore/hyphen number such as "_170" or "-85"
+_BPM_TRAILING_RE = re.compile(r"[_-](\d{2,3})$")
+
 
 def _noop_echo(_: str) -> None:
     """No-op function for echo when none is provided."""
@@ -27,7 +34,10 @@ class ProcessingOptions:
     bit_depth: int | None = None
     mono: bool = False
     warn: bool = False
+    warn_fraction: float = 1.0
+    detector: str = "librosa"
     crispness: int = 5
+    jobs: int | None = None
 
 
 def is_audio_file(path: Path) -> bool:
@@ -45,17 +55,8 @@ def strip_bpm_from_filename(filename: str) -> str:
         loop_160_BPM -> loop
         funky_break -> funky_break (no change)
     """
-    # Pattern 1: number followed by optional separator and "bpm" (case insensitive)
-    # e.g., "140bpm", "140-bpm", "140_BPM", "140 bpm"
-    pattern_with_bpm = r"[\s_-]?(\d{2,3})[\s_-]?bpm"
-    result = re.sub(pattern_with_bpm, "", filename, flags=re.IGNORECASE)
-
-    # Pattern 2: underscore/hyphen followed by 2-3 digit number at end
-    # e.g., "_170", "-85" at the end
-    pattern_trailing = r"[_-](\d{2,3})$"
-    result = re.sub(pattern_trailing, "", result)
-
-    return result
+    result = _BPM_SUFFIX_RE.sub("", filename)
+    return _BPM_TRAILING_RE.sub("", result)
 
 
 def generate_output_path(
@@ -93,6 +94,9 @@ def process_file(
     """
     Process a single audio file to multiple target BPMs.
 
+    Targets are stretched concurrently on up to ``options.jobs`` threads
+    (defaults to the number of CPUs).
+
     Args:
         input_path: Path to input audio file
         targets: List of target BPMs
@@ -106,6 +110,10 @@ def process_file(
     if echo is None:
         echo = _noop_echo
 
+    # Stretching in-process lets detection and all targets share one decode
+    # of the input; the rubberband CLI fallback reads the file itself
+    audio = read_audio(input_path) if load_librubberband() is not None else None
+
     # Detect source BPM
     echo(f"Detecting BPM for {input_path.name}...")
     source_bpm = get_source_bpm(
@@ -113,14 +121,27 @@ def process_file(
         manual_bpm=options.manual_bpm,
         warn=options.warn,
         warn_callback=echo,
+        warn_fraction=options.warn_fraction,
+        audio=audio,
+        detector=options.detector,
     )
     echo(f"  Source BPM: {source_bpm}")
 
-    output_paths = []
-
-    for target_bpm in targets:
-        output_path = generate_output_path(input_path, output_dir, target_bpm)
-        echo(f"  Stretching to {int(target_bpm)} BPM -> {output_path}")
+    def stretch_target(target_bpm: float, output_path: Path) -> Path:
+        if audio is not None:
+            # Time stretch and format conversion with a single write
+            stretch_array_to_bpm(
+                audio,
+                output_path,
+                source_bpm,
+                target_bpm,
+                crispness=options.crispness,
+                sample_rate=options.sample_rate,
+                bit_depth=options.bit_depth,
+                mono=options.mono,
+                make_parents=False,
+            )
+            return output_path
 
         # Time stretch
         stretch_to_bpm(
@@ -129,6 +150,7 @@ def process_file(
             source_bpm,
             target_bpm,
             crispness=options.crispness,
+            make_parents=False,
         )
 
         # Apply format conversion if any options specified
@@ -141,9 +163,42 @@ def process_file(
                 mono=options.mono,
             )
 
-        output_paths.append(output_path)
+        return output_path
+
+    output_paths = [generate_output_path(input_path, output_dir, t) for t in targets]
+    for target_bpm, output_path in zip(targets, output_paths, strict=True):
+        echo(f"  Stretching to {int(target_bpm)} BPM -> {output_path}")
+
+    # Targets share their output folder, so create it once up front
+    for folder in dict.fromkeys(path.parent for path in output_paths):
+        folder.mkdir(parents=True, exist_ok=True)
 
-    return output_paths
+    # Each rubberband run is an independent single-threaded subprocess,
+    # so threads are enough to keep several of them busy at once
+    jobs = min(options.jobs or os.cpu_count() or 1, len(targets))
+
+    if jobs <= 1:
+        return [stretch_target(t, p) for t, p in zip(targets, output_paths, strict=True)]
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(stretch_target, targets, output_paths))
+
+
+def _process_file_buffered(
+    input_path: Path,
+    targets: list[float],
+    output_dir: Path,
+    options: ProcessingOptions,
+) -> tuple[list[Path], list[str]]:
+    """
+    Process a file in a worker process, buffering status messages.
+
+    Messages are returned to the parent so they can be echoed without
+    interleaving output from concurrent workers.
+    """
+    messages: list[str] = []
+    outputs = process_file(input_path, targets, output_dir, options, messages.append)
+    return outputs, messages
 
 
 def process_directory(
@@ -156,6 +211,9 @@ def process_directory(
     """
     Process all audio files in a directory.
 
+    Files are processed in parallel across up to ``options.jobs`` worker
+    processes (defaults to the number of CPUs).
+
     Args:
         input_dir: Directory containing audio files
         targets: List of target BPMs
@@ -169,21 +227,53 @@ def process_directory(
     if echo is None:
         echo = _noop_echo
 
-    # Find all audio files
-    audio_files = sorted([f for f in input_dir.iterdir() if is_audio_file(f)])
+    # Find all audio files, checking the extension before the file type so
+    # other entries never need a stat (DirEntry caches the type from readdir)
+    with os.scandir(input_dir) as entries:
+        audio_files = sorted(
+            Path(entry.path)
+            for entry in entries
+            if os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS and entry.is_file()
+        )
 
     if not audio_files:
         raise ValueError(f"No audio files found in {input_dir}")
 
     echo(f"Found {len(audio_files)} audio file(s)")
 
-    all_outputs = []
-
-    for audio_file in audio_files:
-        outputs = process_file(audio_file, targets, output_dir, options, echo)
-        all_outputs.extend(outputs)
-
-    return all_outputs
+    jobs = min(options.jobs or os.cpu_count() or 1, len(audio_files))
+
+    if jobs == 1:
+        all_outputs = []
+        for audio_file in audio_files:
+            outputs = process_file(audio_file, targets, output_dir, options, echo)
+            all_outputs.extend(outputs)
+        return all_outputs
+
+    # Split the job budget between files so workers don't oversubscribe
+    # the CPUs with their own per-target threads
+    worker_options = replace(options, jobs=max(1, (options.jobs or os.cpu_count() or 1) // jobs))
+    results: dict[Path, list[Path]] = {}
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(_process_file_buffered, f, targets, output_dir, worker_options): f
+            for f in audio_files
+        }
+        try:
+            for future in as_completed(futures):
+                outputs, messages = future.result()
+                for message in messages:
+                    echo(message)
+                results[futures[future]] = outputs
+                echo(f"[{len(results)}/{len(audio_files)}] Finished {futures[future].name}")
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    # Keep output order stable regardless of completion order
+    return [path for audio_file in audio_files for path in results[audio_file]]
 
 
 def parse_targets(
@@ -228,11 +318,4 @@ def parse_targets(
         raise ValueError("No target BPM specified. Use --target, --targets, or --range.")
 
     # Remove duplicates while preserving order
-    seen = set()
-    unique = []
-    for bpm in result:
-        if bpm not in seen:
-            seen.add(bpm)
-            unique.append(bpm)
-
-    return unique
+    return list(dict.fromkeys(result))
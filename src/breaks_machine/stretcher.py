@@ -1,10 +1,61 @@
 """Time-stretching audio using rubberband."""
 
+import ctypes
+import ctypes.util
+import functools
+import math
 import shutil
 import subprocess
 import sys
+from collections.abc import Callable, Iterable, Iterator
 from pathlib import Path
 
+import numpy as np
+import soundfile as sf
+
+from .converter import DecodedAudio, convert_samples, subtype_for_bit_depth
+
+# Frames passed to librubberband per study/process call
+BLOCK_SIZE = 8192
+
+# RubberBandOptions flags from rubberband-c.h (offline mode and the
+# R2 engine are the zero defaults, matching the rubberband CLI)
+_OPTION_TRANSIENTS_MIXED = 0x00000100
+_OPTION_TRANSIENTS_SMOOTH = 0x00000200
+_OPTION_DETECTOR_SOFT = 0x00000800
+_OPTION_PHASE_INDEPENDENT = 0x00002000
+_OPTION_THREADING_NEVER = 0x00010000
+_OPTION_WINDOW_SHORT = 0x00100000
+_OPTION_WINDOW_LONG = 0x00200000
+
+# Option flags equivalent to each rubberband CLI --crisp level
+_CRISPNESS_OPTIONS = {
+    0: _OPTION_TRANSIENTS_SMOOTH | _OPTION_PHASE_INDEPENDENT | _OPTION_WINDOW_LONG,
+    1: _OPTION_DETECTOR_SOFT | _OPTION_PHASE_INDEPENDENT | _OPTION_WINDOW_LONG,
+    2: _OPTION_TRANSIENTS_SMOOTH | _OPTION_PHASE_INDEPENDENT,
+    3: _OPTION_TRANSIENTS_SMOOTH,
+    4: _OPTION_TRANSIENTS_MIXED,
+    5: 0,
+    6: _OPTION_PHASE_INDEPENDENT | _OPTION_WINDOW_SHORT,
+}
+
+# Matching rubberband CLI arguments, built once per level
+_CRISPNESS_ARGS = {level: ("--crisp", str(level)) for level in _CRISPNESS_OPTIONS}
+
+
+def _install_command(platform: str) -> str:
+    """Return the rubberband install instructions for a platform."""
+    if platform == "darwin":
+        return "brew install rubberband"
+    if platform.startswith("linux"):
+        return "sudo apt-get install rubberband-cli"
+    if platform == "win32":
+        return "Download from https://breakfastquay.com/rubberband/"
+    return "See https://breakfastquay.com/rubberband/"
+
+
+_INSTALL_CMD = _install_command(sys.platform)
+
 
 class RubberbandNotFoundError(Exception):
     """Raised when rubberband CLI is not installed."""
@@ -12,6 +63,12 @@ class RubberbandNotFoundError(Exception):
     pass
 
 
+@functools.cache
+def _rubberband_path() -> str | None:
+    """Locate the rubberband CLI on PATH once per process."""
+    return shutil.which("rubberband")
+
+
 def check_rubberband_installed() -> None:
     """
     Verify that rubberband CLI is installed and accessible.
@@ -19,22 +76,254 @@ def check_rubberband_installed() -> None:
     Raises:
         RubberbandNotFoundError: If rubberband is not found with install instructions.
     """
-    if shutil.which("rubberband") is None:
-        platform = sys.platform
-        if platform == "darwin":
-            install_cmd = "brew install rubberband"
-        elif platform.startswith("linux"):
-            install_cmd = "sudo apt-get install rubberband-cli"
-        elif platform == "win32":
-            install_cmd = "Download from https://breakfastquay.com/rubberband/"
-        else:
-            install_cmd = "See https://breakfastquay.com/rubberband/"
-
+    if load_librubberband() is None and _rubberband_path() is None:
         raise RubberbandNotFoundError(
-            f"rubberband CLI not found. Install it with:\n  {install_cmd}"
+            f"rubberband CLI not found. Install it with:\n  {_INSTALL_CMD}"
         )
 
 
+@functools.cache
+def load_librubberband() -> ctypes.CDLL | None:
+    """
+    Load the rubberband shared library for in-process stretching.
+
+    Returns:
+        The loaded library, or None if it is not installed.
+    """
+    name = ctypes.util.find_library("rubberband")
+    if name is None:
+        return None
+    try:
+        lib = ctypes.CDLL(name)
+    except OSError:
+        return None
+
+    state = ctypes.c_void_p
+    channel_ptrs = ctypes.POINTER(ctypes.c_void_p)
+    lib.rubberband_new.argtypes = [
+        ctypes.c_uint,
+        ctypes.c_uint,
+        ctypes.c_int,
+        ctypes.c_double,
+        ctypes.c_double,
+    ]
+    lib.rubberband_new.restype = state
+    lib.rubberband_delete.argtypes = [state]
+    lib.rubberband_delete.restype = None
+    lib.rubberband_set_expected_input_duration.argtypes = [state, ctypes.c_uint]
+    lib.rubberband_set_expected_input_duration.restype = None
+    lib.rubberband_set_max_process_size.argtypes = [state, ctypes.c_uint]
+    lib.rubberband_set_max_process_size.restype = None
+    lib.rubberband_study.argtypes = [state, channel_ptrs, ctypes.c_uint, ctypes.c_int]
+    lib.rubberband_study.restype = None
+    lib.rubberband_process.argtypes = [state, channel_ptrs, ctypes.c_uint, ctypes.c_int]
+    lib.rubberband_process.restype = None
+    lib.rubberband_available.argtypes = [state]
+    lib.rubberband_available.restype = ctypes.c_int
+    lib.rubberband_retrieve.argtypes = [state, channel_ptrs, ctypes.c_uint]
+    lib.rubberband_retrieve.restype = ctypes.c_uint
+    return lib
+
+
+def _check_crispness(crispness: int) -> None:
+    """Raise ValueError for crispness levels rubberband doesn't define."""
+    if crispness not in _CRISPNESS_OPTIONS:
+        raise ValueError(f"Unsupported crispness: {crispness}. Use 0-6.")
+
+
+def _channel_pointers(planar: np.ndarray) -> ctypes.Array:
+    """Build a float** array pointing at each channel row of planar audio."""
+    return (ctypes.c_void_p * planar.shape[0])(
+        *(planar.ctypes.data + channel * planar.strides[0] for channel in range(planar.shape[0]))
+    )
+
+
+def _run_stretcher(
+    lib: ctypes.CDLL,
+    sample_rate: int,
+    channels: int,
+    frames: int,
+    ratio: float,
+    crispness: int,
+    read_blocks: Callable[[], Iterable[np.ndarray]],
+    write_block: Callable[[np.ndarray], None],
+) -> None:
+    """
+    Run an offline librubberband stretch over blocks of audio.
+
+    Args:
+        lib: Loaded rubberband library
+        sample_rate: Sample rate of the audio in Hz
+        channels: Number of audio channels
+        frames: Total number of input frames
+        ratio: Playback rate (>1 = faster, <1 = slower)
+        crispness: Rubberband crispness setting (0-6)
+        read_blocks: Returns a fresh iterator of (frames, channels) float32
+            blocks; called twice, once to study and once to process
+        write_block: Receives each stretched (frames, channels) block
+    """
+    if frames == 0:
+        return
+
+    options = _CRISPNESS_OPTIONS[crispness] | _OPTION_THREADING_NEVER
+    state = lib.rubberband_new(sample_rate, channels, options, 1.0 / ratio, 1.0)
+    try:
+        lib.rubberband_set_expected_input_duration(state, frames)
+        lib.rubberband_set_max_process_size(state, BLOCK_SIZE)
+
+        def feed(func: Callable, drain_output: bool) -> None:
+            consumed = 0
+            for block in read_blocks():
+                consumed += len(block)
+                # librubberband takes one contiguous buffer per channel
+                planar = np.ascontiguousarray(block.T, dtype=np.float32)
+                func(state, _channel_pointers(planar), len(block), int(consumed >= frames))
+                if drain_output:
+                    drain()
+
+        def drain() -> bool:
+            while (available := lib.rubberband_available(state)) > 0:
+                planar = np.empty((channels, available), dtype=np.float32)
+                retrieved = lib.rubberband_retrieve(state, _channel_pointers(planar), available)
+                write_block(planar[:, :retrieved].T)
+            return available < 0
+
+        # Offline mode studies the whole input before processing it
+        feed(lib.rubberband_study, drain_output=False)
+        feed(lib.rubberband_process, drain_output=True)
+        while not drain():
+            pass
+    finally:
+        lib.rubberband_delete(state)
+
+
+def stretch_array(
+    samples: np.ndarray,
+    sample_rate: int,
+    ratio: float,
+    crispness: int = 5,
+) -> np.ndarray:
+    """
+    Time-stretch decoded audio in-process with librubberband.
+
+    Args:
+        samples: Float32 audio as (frames, channels)
+        sample_rate: Sample rate of the audio in Hz
+        ratio: Playback rate (>1 = faster, <1 = slower)
+        crispness: Rubberband crispness setting (0-6, default 5 for drums)
+
+    Returns:
+        Stretched audio as (frames, channels) float32
+
+    Raises:
+        RubberbandNotFoundError: If the rubberband library is not installed.
+        ValueError: If the crispness level is not 0-6.
+    """
+    _check_crispness(crispness)
+    lib = load_librubberband()
+    if lib is None:
+        raise RubberbandNotFoundError("rubberband library not found")
+
+    frames, channels = samples.shape
+    blocks: list[np.ndarray] = []
+    _run_stretcher(
+        lib,
+        sample_rate,
+        channels,
+        frames,
+        ratio,
+        crispness,
+        lambda: (samples[start : start + BLOCK_SIZE] for start in range(0, frames, BLOCK_SIZE)),
+        blocks.append,
+    )
+
+    if not blocks:
+        return np.zeros((0, channels), dtype=np.float32)
+    return np.concatenate(blocks)
+
+
+def _stretch_file(
+    lib: ctypes.CDLL,
+    input_path: Path,
+    output_path: Path,
+    ratio: float,
+    crispness: int,
+    gain: float = 1.0,
+) -> None:
+    """Stretch a file in-process, streaming blocks from input to output."""
+    peak = 0.0
+
+    with sf.SoundFile(input_path) as src:
+        file_format, subtype = _output_format(output_path, src.format, src.subtype)
+        with sf.SoundFile(
+            output_path,
+            "w",
+            samplerate=src.samplerate,
+            channels=src.channels,
+            subtype=subtype,
+            format=file_format,
+        ) as dst:
+
+            def read_blocks() -> Iterator[np.ndarray]:
+                src.seek(0)
+                for block in src.blocks(blocksize=BLOCK_SIZE, dtype="float32", always_2d=True):
+                    yield block * np.float32(gain) if gain != 1.0 else block
+
+            def write_block(block: np.ndarray) -> None:
+                nonlocal peak
+                peak = max(peak, float(np.max(np.abs(block), initial=0.0)))
+                dst.write(block)
+
+            _run_stretcher(
+                lib,
+                src.samplerate,
+                src.channels,
+                src.frames,
+                ratio,
+                crispness,
+                read_blocks,
+                write_block,
+            )
+
+    # Like the rubberband CLI, restart with lowered gain rather than clip
+    # integer formats (the peak is only known once everything is written)
+    if peak > 1.0 and gain == 1.0 and subtype.startswith("PCM"):
+        _stretch_file(lib, input_path, output_path, ratio, crispness, gain=0.999 / peak)
+
+
+def _output_format(output_path: Path, input_format: str, subtype: str) -> tuple[str, str]:
+    """Choose the container and subtype to write output_path with.
+
+    The container follows the output extension, falling back to the input's
+    container only when the extension is unknown. The input subtype is kept
+    unless the chosen container can't hold it.
+    """
+    file_format = output_path.suffix[1:].upper()
+    if file_format not in sf.available_formats():
+        file_format = input_format
+    if not sf.check_format(file_format, subtype):
+        subtype = sf.default_subtype(file_format)
+    return file_format, subtype
+
+
+def _write_stretched(
+    output_path: Path,
+    stretched: np.ndarray,
+    sample_rate: int,
+    subtype: str,
+    input_format: str,
+) -> None:
+    """Write stretched audio, avoiding clipping in integer formats."""
+    file_format, subtype = _output_format(output_path, input_format, subtype)
+
+    # Like the rubberband CLI, lower the gain rather than clip integer formats
+    peak = float(np.max(np.abs(stretched), initial=0.0))
+    if peak > 1.0 and subtype.startswith("PCM"):
+        stretched = stretched * (0.999 / peak)
+
+    sf.write(output_path, stretched, sample_rate, subtype=subtype, format=file_format)
+
+
 def calculate_stretch_ratio(source_bpm: float, target_bpm: float) -> float:
     """
     Calculate the time stretch ratio to convert from source to target BPM.
@@ -58,9 +347,13 @@ def stretch_audio(
     output_path: Path,
     ratio: float,
     crispness: int = 5,
+    make_parents: bool = True,
 ) -> None:
     """
-    Time-stretch audio file using rubberband CLI directly.
+    Time-stretch audio file using rubberband.
+
+    Uses librubberband in-process when the shared library is available,
+    otherwise falls back to calling the rubberband CLI.
 
     Args:
         input_path: Path to input audio file
@@ -68,30 +361,53 @@ def stretch_audio(
         ratio: Playback rate (>1 = faster, <1 = slower)
         crispness: Rubberband crispness setting (0-6, default 5 for drums)
                    Higher values preserve transients better.
+        make_parents: Create the output directory if it doesn't exist
+
+    Raises:
+        ValueError: If the crispness level is not 0-6.
     """
+    _check_crispness(crispness)
+
     # Ensure output directory exists
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if make_parents:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # No stretching needed - just copy the file
-    if ratio == 1.0:
+    # No stretching needed - just copy the file (tolerating float error
+    # from BPM ratios like 3 * (1/3))
+    if math.isclose(ratio, 1.0, rel_tol=1e-9):
         shutil.copy2(input_path, output_path)
         return
 
+    # Stretch in-process when librubberband is available
+    lib = load_librubberband()
+    if lib is not None:
+        _stretch_file(lib, input_path, output_path, ratio, crispness)
+        return
+
+    # CPython launches with posix_spawn instead of fork/exec when given an
+    # absolute executable path and no preexec_fn/pass_fds/cwd
+    executable = _rubberband_path()
+    if executable is None:
+        raise RubberbandNotFoundError("rubberband CLI not found")
+
     # Call rubberband CLI directly using --tempo (playback rate)
     # --tempo 2.0 = double speed (half duration)
     # --tempo 0.5 = half speed (double duration)
+    # Files are passed by path rather than piped through stdin/stdout: offline
+    # mode seeks back over the input after its study pass, and the output
+    # format is chosen from the file extension.
     result = subprocess.run(
         [
-            "rubberband",
+            executable,
             "--tempo",
             str(ratio),
-            "--crisp",
-            str(crispness),
+            *_CRISPNESS_ARGS[crispness],
             "--quiet",
             str(input_path),
             str(output_path),
         ],
-        capture_output=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
         text=True,
     )
 
@@ -105,6 +421,7 @@ def stretch_to_bpm(
     source_bpm: float,
     target_bpm: float,
     crispness: int = 5,
+    make_parents: bool = True,
 ) -> None:
     """
     Convenience function to stretch audio from source BPM to target BPM.
@@ -115,6 +432,60 @@ def stretch_to_bpm(
         source_bpm: Original tempo in BPM
         target_bpm: Desired tempo in BPM
         crispness: Rubberband crispness setting (0-6, default 5 for drums)
+        make_parents: Create the output directory if it doesn't exist
+    """
+    ratio = calculate_stretch_ratio(source_bpm, target_bpm)
+    stretch_audio(input_path, output_path, ratio, crispness, make_parents=make_parents)
+
+
+def stretch_array_to_bpm(
+    audio: DecodedAudio,
+    output_path: Path,
+    source_bpm: float,
+    target_bpm: float,
+    crispness: int = 5,
+    sample_rate: int | None = None,
+    bit_depth: int | None = None,
+    mono: bool = False,
+    make_parents: bool = True,
+) -> None:
+    """
+    Stretch already-decoded audio from source BPM to target BPM.
+
+    Lets several targets share a single decode of the input file, and
+    applies any format conversion around the stretch so the output is
+    written once.
+    Requires the rubberband library; use stretch_to_bpm for the CLI fallback.
+
+    Args:
+        audio: Decoded input audio
+        output_path: Path for output audio file
+        source_bpm: Original tempo in BPM
+        target_bpm: Desired tempo in BPM
+        crispness: Rubberband crispness setting (0-6, default 5 for drums)
+        sample_rate: Target sample rate in Hz (defaults to the input's)
+        bit_depth: Target bit depth (defaults to the input's)
+        mono: Convert to mono if True
+        make_parents: Create the output directory if it doesn't exist
     """
+    subtype = subtype_for_bit_depth(bit_depth, audio.subtype)
+    if make_parents:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Downmix and downsample before stretching so rubberband has fewer
+    # channels and frames to process; upsampling waits until afterwards
+    early_rate = (
+        sample_rate if sample_rate is not None and sample_rate < audio.sample_rate else None
+    )
+    samples, sr = convert_samples(
+        audio.samples, audio.sample_rate, sample_rate=early_rate, mono=mono
+    )
+    if samples.ndim == 1:
+        samples = samples[:, np.newaxis]
+
     ratio = calculate_stretch_ratio(source_bpm, target_bpm)
-    stretch_audio(input_path, output_path, ratio, crispness)
+    if not math.isclose(ratio, 1.0, rel_tol=1e-9):
+        samples = stretch_array(samples, sr, ratio, crispness)
+
+    samples, sr = convert_samples(samples, sr, sample_rate=sample_rate)
+    _write_stretched(output_path, samples, sr, subtype, audio.format)
@@ -1,11 +1,67 @@
 """Test fixtures and configuration."""
 
+import functools
+import io
+import shutil
 from pathlib import Path
 
 import numpy as np
 import pytest
 import soundfile as sf
 
+from breaks_machine import detector, processor, stretcher
+
+
+@functools.cache
+def _decay(decay_samples: int, decay_end: float) -> np.ndarray:
+    """Exponential decay envelope shared by every hit of the same shape."""
+    return np.exp(-np.linspace(0, decay_end, decay_samples)).astype(np.float32)
+
+
+def _synthesize_hits(
+    sr: int,
+    duration: float,
+    hit_times: np.ndarray,
+    decay_seconds: float,
+    decay_end: float,
+    seed: int,
+) -> np.ndarray:
+    """Build a normalized signal of exponentially decaying noise bursts."""
+    # Seeded per signal so its audio doesn't depend on fixture order
+    rng = np.random.default_rng(seed)
+    audio = np.zeros(int(sr * duration), dtype=np.float32)
+
+    # One noise burst per hit, scattered into the signal in a single pass
+    decay_samples = int(decay_seconds * sr)
+    noise = rng.standard_normal((len(hit_times), decay_samples), dtype=np.float32)
+    noise *= _decay(decay_samples, decay_end)
+    offsets = (hit_times * sr).astype(np.int64)[:, None] + np.arange(decay_samples)
+    in_bounds = offsets < len(audio)
+    np.add.at(audio, offsets[in_bounds], noise[in_bounds])
+
+    # Normalize
+    return audio / np.max(np.abs(audio)) * 0.8
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Keep the BPM detection cache out of the user's home directory."""
+    cache_home = tmp_path / "cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+    monkeypatch.setattr(detector, "_memory_cache", {})
+    return cache_home
+
+
+@pytest.fixture
+def rubberband_cli_only(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Hide librubberband so stretching goes through the rubberband CLI."""
+    if shutil.which("rubberband") is None:
+        pytest.skip("rubberband CLI not installed")
+
+    stretcher.load_librubberband.cache_clear()
+    monkeypatch.setattr(stretcher, "load_librubberband", lambda: None)
+    monkeypatch.setattr(processor, "load_librubberband", lambda: None)
+
 
 @pytest.fixture
 def fixtures_dir() -> Path:
@@ -13,6 +69,18 @@ def fixtures_dir() -> Path:
     return Path(__file__).parent / "fixtures"
 
 
+@functools.cache
+def _break_120() -> tuple[np.ndarray, int]:
+    """Synthesize one second of a 120 BPM break at 44100 Hz."""
+    # Create a simple drum-like sound (click with decay)
+    sr = 44100
+
+    # Two hits in 1 second = 120 BPM, each a 100ms noise burst
+    hit_times = np.array([0.0, 0.5])
+    audio = _synthesize_hits(sr, 1.0, hit_times, 0.1, 5, seed=120)
+    return audio, sr
+
+
 @pytest.fixture
 def temp_audio_file(tmp_path: Path) -> Path:
     """
@@ -20,29 +88,10 @@ def temp_audio_file(tmp_path: Path) -> Path:
 
     Returns a 1-second mono audio file at 44100 Hz.
     """
-    # Create a simple drum-like sound (click with decay)
-    sr = 44100
-    duration = 1.0
-    t = np.linspace(0, duration, int(sr * duration), endpoint=False)
-
-    # Create 4 "hits" at 120 BPM (2 hits per second = 120 BPM)
-    audio = np.zeros_like(t)
-    hit_times = [0.0, 0.5]  # Two hits in 1 second = 120 BPM
-
-    for hit_time in hit_times:
-        hit_idx = int(hit_time * sr)
-        # Exponential decay "click"
-        decay_samples = int(0.1 * sr)  # 100ms decay
-        decay = np.exp(-np.linspace(0, 5, decay_samples))
-        # Add some noise burst
-        noise = np.random.randn(decay_samples) * decay
-        end_idx = min(hit_idx + decay_samples, len(audio))
-        audio[hit_idx:end_idx] = noise[: end_idx - hit_idx]
-
-    # Normalize
-    audio = audio / np.max(np.abs(audio)) * 0.8
+    audio, sr = _break_120()
 
-    # Save to temp file
+    # Save to temp file; kept at PCM_16 since conversion tests treat
+    # 16-bit as this file's existing bit depth
     output_path = tmp_path / "test_break_120.wav"
     sf.write(output_path, audio, sr, subtype="PCM_16")
 
@@ -50,37 +99,60 @@ def temp_audio_file(tmp_path: Path) -> Path:
 
 
 @pytest.fixture
-def temp_audio_file_170bpm(tmp_path: Path) -> Path:
+def temp_audio_bytes() -> io.BytesIO:
     """
-    Create a temporary test audio file at 170 BPM.
+    Create the temp_audio_file break as an in-memory WAV.
 
-    The filename includes the BPM for testing filename parsing.
+    For tests that only read the audio back and need no path on disk.
     """
+    audio, sr = _break_120()
+
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sr, format="WAV", subtype="PCM_16")
+    buffer.seek(0)
+
+    return buffer
+
+
+@functools.cache
+def _break_170() -> tuple[np.ndarray, int]:
+    """Synthesize one second of a 170 BPM break at 44100 Hz."""
     sr = 44100
     duration = 1.0
-    t = np.linspace(0, duration, int(sr * duration), endpoint=False)
 
     # 170 BPM = 2.83 beats per second
     # For a 1 second file, we'll have roughly 2.83 beats
     beat_interval = 60.0 / 170.0  # ~0.353 seconds between beats
-    audio = np.zeros_like(t)
-
-    beat_time = 0.0
-    while beat_time < duration:
-        hit_idx = int(beat_time * sr)
-        if hit_idx >= len(audio):
-            break
-        decay_samples = int(0.05 * sr)
-        decay = np.exp(-np.linspace(0, 8, decay_samples))
-        noise = np.random.randn(decay_samples) * decay
-        end_idx = min(hit_idx + decay_samples, len(audio))
-        audio[hit_idx:end_idx] = noise[: end_idx - hit_idx]
-        beat_time += beat_interval
-
-    audio = audio / np.max(np.abs(audio)) * 0.8
+    hit_times = np.arange(0.0, duration, beat_interval)
+    audio = _synthesize_hits(sr, duration, hit_times, 0.05, 8, seed=170)
+    return audio, sr
+
+
+@functools.cache
+def _stereo_noise() -> tuple[np.ndarray, int]:
+    """Synthesize half a second of stereo noise at 44100 Hz."""
+    sr = 44100
+    duration = 0.5
+    samples = int(sr * duration)
+
+    # Create stereo audio (2 channels)
+    rng = np.random.default_rng(2)
+    left = rng.standard_normal(samples, dtype=np.float32) * 0.5
+    right = rng.standard_normal(samples, dtype=np.float32) * 0.5
+    return np.column_stack([left, right]), sr
+
+
+@pytest.fixture
+def temp_audio_file_170bpm(tmp_path: Path) -> Path:
+    """
+    Create a temporary test audio file at 170 BPM.
+
+    The filename includes the BPM for testing filename parsing.
+    """
+    audio, sr = _break_170()
 
     output_path = tmp_path / "amen_170.wav"
-    sf.write(output_path, audio, sr, subtype="PCM_16")
+    sf.write(output_path, audio, sr, subtype="FLOAT")
 
     return output_path
 
@@ -88,16 +160,9 @@ def temp_audio_file_170bpm(tmp_path: Path) -> Path:
 @pytest.fixture
 def temp_stereo_file(tmp_path: Path) -> Path:
     """Create a stereo audio file for testing mono conversion."""
-    sr = 44100
-    duration = 0.5
-    samples = int(sr * duration)
-
-    # Create stereo audio (2 channels)
-    left = np.random.randn(samples) * 0.5
-    right = np.random.randn(samples) * 0.5
-    audio = np.column_stack([left, right])
+    audio, sr = _stereo_noise()
 
     output_path = tmp_path / "stereo_test.wav"
-    sf.write(output_path, audio, sr, subtype="PCM_16")
+    sf.write(output_path, audio, sr, subtype="FLOAT")
 
     return output_path
@@ -1,8 +1,18 @@
 """Tests for audio format conversion."""
 
+import stat
+
+import numpy as np
+import pytest
 import soundfile as sf
 
-from breaks_machine.converter import convert_audio, get_audio_info
+from breaks_machine.converter import (
+    convert_audio,
+    convert_samples,
+    get_audio_info,
+    read_audio,
+    subtype_for_bit_depth,
+)
 
 
 class TestConvertAudio:
@@ -13,6 +23,15 @@ class TestConvertAudio:
         result = convert_audio(temp_audio_file)
         assert result == temp_audio_file
 
+    def test_matching_options_skip_rewrite(self, temp_audio_file):
+        """Test that options matching the input leave the file untouched."""
+        mtime_ns = temp_audio_file.stat().st_mtime_ns
+
+        result = convert_audio(temp_audio_file, sample_rate=44100, bit_depth=16, mono=True)
+
+        assert result == temp_audio_file
+        assert temp_audio_file.stat().st_mtime_ns == mtime_ns
+
     def test_sample_rate_conversion(self, temp_audio_file, tmp_path):
         """Test sample rate conversion."""
         output_path = tmp_path / "resampled.wav"
@@ -27,6 +46,40 @@ class TestConvertAudio:
         converted_info = sf.info(output_path)
         assert converted_info.samplerate == 48000
 
+    def test_resampling_spans_blocks(self, tmp_path):
+        """Test that streamed resampling keeps duration across many blocks."""
+        input_path = tmp_path / "long.wav"
+        frames = 200_000
+        sf.write(input_path, np.zeros((frames, 2)), 44100, subtype="PCM_16")
+        output_path = tmp_path / "resampled.wav"
+
+        convert_audio(input_path, output_path, sample_rate=48000)
+
+        converted_info = sf.info(output_path)
+        assert converted_info.channels == 2
+        assert abs(converted_info.frames - frames * 48000 / 44100) <= 1
+
+    def test_in_place_conversion(self, temp_stereo_file):
+        """Test converting a file over itself."""
+        result = convert_audio(temp_stereo_file, mono=True, sample_rate=22050)
+
+        assert result == temp_stereo_file
+        converted_info = sf.info(temp_stereo_file)
+        assert converted_info.channels == 1
+        assert converted_info.samplerate == 22050
+        assert list(temp_stereo_file.parent.glob("*.wav")) == [temp_stereo_file]
+
+    def test_output_keeps_permissions(self, temp_stereo_file, tmp_path):
+        """Test that converted files keep the input's permission bits."""
+        temp_stereo_file.chmod(0o644)
+        output_path = tmp_path / "converted.wav"
+
+        convert_audio(temp_stereo_file, output_path, mono=True)
+        convert_audio(temp_stereo_file, mono=True)
+
+        assert stat.S_IMODE(output_path.stat().st_mode) == 0o644
+        assert stat.S_IMODE(temp_stereo_file.stat().st_mode) == 0o644
+
     def test_mono_conversion(self, temp_stereo_file, tmp_path):
         """Test stereo to mono conversion."""
         output_path = tmp_path / "mono.wav"
@@ -69,12 +122,49 @@ class TestConvertAudio:
         assert converted_info.subtype == "PCM_16"
 
 
+class TestConvertSamples:
+    """Tests for in-memory conversion."""
+
+    def test_no_conversion(self):
+        """Test that samples pass through untouched without options."""
+        samples = np.zeros((100, 2), dtype=np.float32)
+
+        result, sr = convert_samples(samples, 44100)
+
+        assert result is samples
+        assert sr == 44100
+
+    def test_resample_and_mono(self):
+        """Test resampling and downmixing together."""
+        samples = np.ones((44100, 2), dtype=np.float32)
+
+        result, sr = convert_samples(samples, 44100, sample_rate=22050, mono=True)
+
+        assert sr == 22050
+        assert result.shape == (22050,)
+        assert result.dtype == np.float32
+
+
+class TestSubtypeForBitDepth:
+    """Tests for bit depth to subtype mapping."""
+
+    def test_default_kept(self):
+        assert subtype_for_bit_depth(None, "PCM_16") == "PCM_16"
+
+    def test_bit_depth(self):
+        assert subtype_for_bit_depth(24, "PCM_16") == "PCM_24"
+
+    def test_unsupported_bit_depth(self):
+        with pytest.raises(ValueError, match="Unsupported bit depth"):
+            subtype_for_bit_depth(8, "PCM_16")
+
+
 class TestGetAudioInfo:
     """Tests for audio info retrieval."""
 
-    def test_get_audio_info(self, temp_audio_file):
+    def test_get_audio_info(self, temp_audio_bytes):
         """Test getting audio file info."""
-        info = get_audio_info(temp_audio_file)
+        info = get_audio_info(temp_audio_bytes)
 
         assert info["sample_rate"] == 44100
         assert info["channels"] == 1
@@ -82,3 +172,23 @@ class TestGetAudioInfo:
         assert info["subtype"] == "PCM_16"
         assert info["duration"] > 0
         assert info["frames"] > 0
+
+
+class TestReadAudio:
+    """Tests for audio decoding."""
+
+    def test_read_mono(self, temp_audio_bytes):
+        """Test that mono audio decodes to a single float32 column."""
+        audio = read_audio(temp_audio_bytes)
+
+        assert audio.samples.dtype == np.float32
+        assert audio.samples.shape == (44100, 1)
+        assert audio.sample_rate == 44100
+        assert audio.subtype == "PCM_16"
+        assert audio.format == "WAV"
+
+    def test_read_stereo(self, temp_stereo_file):
+        """Test that stereo audio decodes to two columns."""
+        audio = read_audio(temp_stereo_file)
+
+        assert audio.samples.shape == (22050, 2)
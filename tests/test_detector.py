@@ -1,10 +1,23 @@
 """Tests for BPM detection."""
 
+import json
+import os
 from pathlib import Path
 
+import numpy as np
+import pytest
+import soundfile as sf
+
+from breaks_machine import detector
+from breaks_machine.converter import read_audio
 from breaks_machine.detector import (
+    BPMDetectionError,
     bpms_match,
+    detect_bpm_cached,
+    detect_bpm_fast,
     detect_bpm_with_librosa,
+    get_cache_path,
+    get_cached_bpm,
     get_source_bpm,
     parse_bpm_from_filename,
 )
@@ -36,6 +49,17 @@ class TestParseBpmFromFilename:
         assert parse_bpm_from_filename(Path("fast_drum_175bpm.wav")) == 175
         assert parse_bpm_from_filename(Path("slow_beat_90bpm.wav")) == 90
 
+    def test_pattern_priority(self):
+        # "bpm" suffix wins over leading and trailing numbers
+        assert parse_bpm_from_filename(Path("120_break_140bpm_160.wav")) == 140
+        # Leading number wins over trailing number
+        assert parse_bpm_from_filename(Path("120_break_160.wav")) == 120
+
+    def test_out_of_range_falls_through(self):
+        # An out-of-range match defers to the next pattern
+        assert parse_bpm_from_filename(Path("break_200bpm_140.wav")) == 140
+        assert parse_bpm_from_filename(Path("808_loop_170.wav")) == 170
+
     def test_no_bpm_in_filename(self):
         assert parse_bpm_from_filename(Path("drum_loop.wav")) is None
         assert parse_bpm_from_filename(Path("amen_break.flac")) is None
@@ -80,6 +104,146 @@ class TestDetectBpmWithLibrosa:
         # Just verify it returns a positive number in a reasonable range
         assert 40 <= bpm <= 250
 
+    def test_decoded_audio_matches_file(self, temp_audio_file_170bpm):
+        """Test that passing decoded audio gives the same result as loading."""
+        from_file = detect_bpm_with_librosa(temp_audio_file_170bpm)
+        from_audio = detect_bpm_with_librosa(
+            temp_audio_file_170bpm, read_audio(temp_audio_file_170bpm)
+        )
+
+        assert from_audio == from_file
+
+
+def _drum_break(bpm: float, duration: float = 10.0, sr: int = 44100) -> np.ndarray:
+    """Synthesize a kick/snare/hat break at a given tempo."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(0.3 * sr)) / sr
+    kick = np.sin(2 * np.pi * 55 * t * (1 + 2 * np.exp(-30 * t))) * np.exp(-12 * t)
+    snare = rng.standard_normal(len(t)) * np.exp(-20 * t) * 0.7
+    hat = rng.standard_normal(len(t)) * np.exp(-80 * t) * 0.25
+
+    audio = np.zeros(int(duration * sr) + len(t))
+    beat = 60 / bpm
+    for bar_start in np.arange(0, duration, 4 * beat):
+        # Kick on 1 and the "and" of 3, snare on 2 and 4, eighth-note hats
+        hits = [(kick, 0), (kick, 2.5), (snare, 1), (snare, 3)]
+        hits += [(hat, eighth / 2) for eighth in range(8)]
+        for sound, beats in hits:
+            start = int((bar_start + beats * beat) * sr)
+            if start < duration * sr:
+                audio[start : start + len(t)] += sound
+
+    audio = audio[: int(duration * sr)]
+    return (audio / np.max(np.abs(audio)) * 0.8).astype(np.float32)
+
+
+class TestDetectBpmFast:
+    """Tests for autocorrelation-based BPM detection."""
+
+    @pytest.mark.parametrize("bpm", [120, 140, 170])
+    def test_detects_drum_break(self, tmp_path, bpm):
+        """Test that a kick/snare/hat break is detected at its tempo."""
+        path = tmp_path / "break.wav"
+        sf.write(path, _drum_break(bpm), 44100)
+
+        assert abs(detect_bpm_fast(path) - bpm) < 2
+
+    def test_silence_raises(self, tmp_path):
+        """Test that audio without onsets is not given a tempo."""
+        path = tmp_path / "silence.wav"
+        sf.write(path, np.zeros(44100 * 4, dtype=np.float32), 44100)
+
+        with pytest.raises(BPMDetectionError):
+            detect_bpm_fast(path)
+
+    @pytest.mark.parametrize("frames", [0, 100])
+    def test_very_short_file_raises(self, tmp_path, frames):
+        """Test that audio too short to analyse raises BPMDetectionError."""
+        path = tmp_path / "short.wav"
+        sf.write(path, np.zeros(frames, dtype=np.float32), 44100)
+
+        with pytest.raises(BPMDetectionError, match="too short"):
+            detect_bpm_fast(path)
+
+    def test_detects_click_track(self, tmp_path):
+        """Test that a steady click track is detected at its tempo."""
+        sr = 44100
+        audio = np.zeros(8 * sr, dtype=np.float32)
+        audio[:: sr // 2] = 1.0  # 120 BPM
+        path = tmp_path / "clicks.wav"
+        sf.write(path, audio, sr)
+
+        assert abs(detect_bpm_fast(path) - 120) < 1
+
+    def test_decoded_audio_matches_file(self, temp_audio_file_170bpm):
+        """Test that passing decoded audio gives the same result as loading."""
+        from_file = detect_bpm_fast(temp_audio_file_170bpm)
+        from_audio = detect_bpm_fast(temp_audio_file_170bpm, read_audio(temp_audio_file_170bpm))
+
+        assert from_audio == from_file
+        assert 80 <= from_file <= 200
+
+
+class TestDetectBpmCached:
+    """Tests for cached BPM detection."""
+
+    def test_result_is_cached(self, temp_audio_file):
+        """Test that detection results are written to the cache."""
+        bpm = detect_bpm_cached(temp_audio_file)
+
+        entries = json.loads(get_cache_path().read_text())["entries"]
+        assert list(entries.values()) == [bpm]
+
+    def test_cache_hit_skips_detection(self, temp_audio_file):
+        """Test that a cached value is returned without re-detecting."""
+        detect_bpm_cached(temp_audio_file)
+
+        # Overwrite the cached value to prove it is what gets returned
+        cache_path = get_cache_path()
+        data = json.loads(cache_path.read_text())
+        key = next(iter(data["entries"]))
+        data["entries"][key] = 123.0
+        cache_path.write_text(json.dumps(data))
+        detector._memory_cache.clear()  # as in a fresh run
+
+        assert detect_bpm_cached(temp_audio_file) == 123.0
+
+    def test_repeat_lookup_skips_cache_file(self, temp_audio_file):
+        """Test that a detection is remembered in memory for the process."""
+        bpm = detect_bpm_cached(temp_audio_file)
+        get_cache_path().unlink()
+
+        assert get_cached_bpm(temp_audio_file) == bpm
+
+    def test_modified_file_invalidates_cache(self, temp_audio_file):
+        """Test that changing a file's mtime triggers a fresh detection."""
+        detect_bpm_cached(temp_audio_file)
+        stat = temp_audio_file.stat()
+        os.utime(temp_audio_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        detect_bpm_cached(temp_audio_file)
+
+        entries = json.loads(get_cache_path().read_text())["entries"]
+        assert len(entries) == 2
+
+    def test_detectors_cached_separately(self, temp_audio_file):
+        """Test that each detection method gets its own cache entry."""
+        detect_bpm_cached(temp_audio_file)
+        detect_bpm_cached(temp_audio_file, detector="fast")
+
+        entries = json.loads(get_cache_path().read_text())["entries"]
+        assert len(entries) == 2
+
+    def test_corrupt_cache_ignored(self, temp_audio_file):
+        """Test that an unreadable cache file is treated as empty."""
+        cache_path = get_cache_path()
+        cache_path.parent.mkdir(parents=True)
+        cache_path.write_text("not json")
+
+        bpm = detect_bpm_cached(temp_audio_file)
+
+        assert 40 <= bpm <= 250
+
 
 class TestGetSourceBpm:
     """Tests for get_source_bpm function."""
@@ -118,3 +282,38 @@ class TestGetSourceBpm:
         # We may or may not get a warning depending on detection accuracy
         # Just verify the function runs without error
         assert True
+
+    def test_warn_fraction_zero_skips_detection(self, temp_audio_file_170bpm):
+        """Validation detection should be skipped when not sampled."""
+        warnings = []
+
+        result = get_source_bpm(
+            temp_audio_file_170bpm,
+            warn=True,
+            warn_callback=warnings.append,
+            warn_fraction=0.0,
+        )
+
+        assert result == 170
+        assert warnings == []
+        assert not get_cache_path().exists()
+
+    def test_warn_uses_cached_detection(self, temp_audio_file_170bpm):
+        """Cached detections should be checked even when not sampled."""
+        detect_bpm_cached(temp_audio_file_170bpm)
+        cache_path = get_cache_path()
+        data = json.loads(cache_path.read_text())
+        key = next(iter(data["entries"]))
+        data["entries"][key] = 100.0
+        cache_path.write_text(json.dumps(data))
+        detector._memory_cache.clear()  # as in a fresh run
+        warnings = []
+
+        get_source_bpm(
+            temp_audio_file_170bpm,
+            warn=True,
+            warn_callback=warnings.append,
+            warn_fraction=0.0,
+        )
+
+        assert warnings == ["Filename suggests 170.0 BPM, but detected 100.0 BPM"]
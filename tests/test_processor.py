@@ -1,14 +1,19 @@
 """Tests for processing pipeline."""
 
+import shutil
 from pathlib import Path
 
 import pytest
+import soundfile as sf
 
 from breaks_machine.processor import (
     ProcessingOptions,
     generate_output_path,
     is_audio_file,
     parse_targets,
+    process_directory,
+    process_file,
+    strip_bpm_from_filename,
 )
 
 
@@ -36,6 +41,21 @@ class TestIsAudioFile:
         assert is_audio_file(tmp_path) is False
 
 
+class TestStripBpmFromFilename:
+    """Tests for BPM removal from filenames."""
+
+    def test_trailing_number(self):
+        assert strip_bpm_from_filename("amen_170") == "amen"
+        assert strip_bpm_from_filename("think-85") == "think"
+
+    def test_bpm_suffix(self):
+        assert strip_bpm_from_filename("break-140bpm") == "break"
+        assert strip_bpm_from_filename("loop_160_BPM") == "loop"
+
+    def test_no_bpm(self):
+        assert strip_bpm_from_filename("funky_break") == "funky_break"
+
+
 class TestGenerateOutputPath:
     """Tests for output path generation."""
 
@@ -118,7 +138,10 @@ class TestProcessingOptions:
         assert options.bit_depth is None
         assert options.mono is False
         assert options.warn is False
+        assert options.warn_fraction == 1.0
+        assert options.detector == "librosa"
         assert options.crispness == 5
+        assert options.jobs is None
 
     def test_custom_values(self):
         """Test custom values."""
@@ -137,3 +160,91 @@ class TestProcessingOptions:
         assert options.mono is True
         assert options.warn is True
         assert options.crispness == 6
+
+
+class TestProcessFile:
+    """Tests for single file processing."""
+
+    def test_parallel_targets_keep_order(self, temp_audio_file_170bpm, tmp_path):
+        """Test that concurrently stretched targets are returned in target order."""
+        output_dir = tmp_path / "output"
+        targets = [140.0, 90.0, 170.0, 120.0]
+
+        outputs = process_file(
+            temp_audio_file_170bpm, targets, output_dir, ProcessingOptions(jobs=4)
+        )
+
+        assert outputs == [output_dir / "amen_170" / f"amen_{int(t)}.wav" for t in targets]
+        assert all(path.exists() for path in outputs)
+
+    @pytest.mark.usefixtures("rubberband_cli_only")
+    def test_cli_fallback_applies_conversion(self, temp_stereo_file, tmp_path):
+        """Test that the CLI path stretches, then converts each output."""
+        options = ProcessingOptions(manual_bpm=120, sample_rate=22050, bit_depth=24, mono=True)
+
+        outputs = process_file(temp_stereo_file, [90.0, 140.0], tmp_path / "output", options)
+
+        for path in outputs:
+            info = sf.info(path)
+            assert info.samplerate == 22050
+            assert info.subtype == "PCM_24"
+            assert info.channels == 1
+
+
+class TestProcessDirectory:
+    """Tests for batch directory processing."""
+
+    @pytest.fixture
+    def input_dir(self, temp_audio_file_170bpm, tmp_path):
+        """Create a directory with several 170 BPM files."""
+        input_dir = tmp_path / "input"
+        input_dir.mkdir()
+        for name in ["think_170.wav", "amen_170.wav", "funky_170.wav"]:
+            shutil.copy(temp_audio_file_170bpm, input_dir / name)
+        return input_dir
+
+    def test_parallel_jobs(self, input_dir, tmp_path):
+        """Test that files are processed across worker processes."""
+        output_dir = tmp_path / "output"
+        messages = []
+
+        # Same-BPM target copies the file, so no rubberband call is needed
+        outputs = process_directory(
+            input_dir, [170.0], output_dir, ProcessingOptions(jobs=2), echo=messages.append
+        )
+
+        # Outputs follow sorted input order regardless of completion order
+        assert outputs == [
+            output_dir / "amen_170" / "amen_170.wav",
+            output_dir / "funky_170" / "funky_170.wav",
+            output_dir / "think_170" / "think_170.wav",
+        ]
+        assert all(path.exists() for path in outputs)
+        assert "Detecting BPM for amen_170.wav..." in messages
+
+    def test_sequential_matches_parallel(self, input_dir, tmp_path):
+        """Test that a single job gives the same outputs as a pool."""
+        sequential = process_directory(
+            input_dir, [170.0], tmp_path / "seq", ProcessingOptions(jobs=1)
+        )
+        parallel = process_directory(input_dir, [170.0], tmp_path / "par", ProcessingOptions())
+
+        assert [p.relative_to(tmp_path / "seq") for p in sequential] == [
+            p.relative_to(tmp_path / "par") for p in parallel
+        ]
+
+    def test_skips_non_audio_entries(self, input_dir, tmp_path):
+        """Test that other files and folders with audio suffixes are skipped."""
+        (input_dir / "notes.txt").touch()
+        (input_dir / "folder.wav").mkdir()
+
+        outputs = process_directory(
+            input_dir, [170.0], tmp_path / "output", ProcessingOptions(jobs=1)
+        )
+
+        assert [p.parent.name for p in outputs] == ["amen_170", "funky_170", "think_170"]
+
+    def test_empty_directory_error(self, tmp_path):
+        """Test that a directory without audio files raises error."""
+        with pytest.raises(ValueError, match="No audio files found"):
+            process_directory(tmp_path, [120.0], tmp_path / "output", ProcessingOptions())
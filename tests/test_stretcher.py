@@ -1,10 +1,14 @@
 """Tests for audio stretching."""
 
+import numpy as np
+import pytest
 import soundfile as sf
 
+from breaks_machine.converter import read_audio
 from breaks_machine.stretcher import (
     calculate_stretch_ratio,
     check_rubberband_installed,
+    stretch_array_to_bpm,
     stretch_audio,
     stretch_to_bpm,
 )
@@ -46,6 +50,19 @@ class TestCheckRubberbandInstalled:
 class TestStretchAudio:
     """Tests for audio stretching."""
 
+    def test_identity_ratio_copies_file(self, temp_audio_file, tmp_path):
+        """Test that a ratio within float error of 1.0 copies the input."""
+        output_path = tmp_path / "out" / "copied.wav"
+
+        stretch_audio(temp_audio_file, output_path, 1.0 + 1e-12)
+
+        assert output_path.read_bytes() == temp_audio_file.read_bytes()
+
+    def test_invalid_crispness(self, temp_audio_file, tmp_path):
+        """Test that crispness outside 0-6 is rejected."""
+        with pytest.raises(ValueError, match="Unsupported crispness"):
+            stretch_audio(temp_audio_file, tmp_path / "out.wav", 0.8, crispness=7)
+
     def test_stretch_creates_output(self, temp_audio_file, tmp_path):
         """Test that stretching creates an output file."""
         output_path = tmp_path / "stretched.wav"
@@ -82,6 +99,70 @@ class TestStretchAudio:
 
         assert stretched_info.samplerate == original_info.samplerate
 
+    def test_stretch_preserves_format(self, temp_stereo_file, tmp_path):
+        """Test that stretching keeps channels and subtype."""
+        output_path = tmp_path / "stretched.wav"
+
+        stretch_audio(temp_stereo_file, output_path, ratio=0.8)
+        stretched_info = sf.info(output_path)
+
+        assert stretched_info.channels == 2
+        assert stretched_info.subtype == sf.info(temp_stereo_file).subtype
+
+    def test_container_follows_output_extension(self, temp_stereo_file, tmp_path):
+        """Test that the output container comes from the output extension."""
+        input_path = tmp_path / "input.flac"
+        sf.write(input_path, sf.read(temp_stereo_file)[0], 44100, subtype="PCM_16")
+        output_path = tmp_path / "stretched.wav"
+
+        stretch_audio(input_path, output_path, ratio=0.8)
+
+        assert sf.info(output_path).format == "WAV"
+
+    @pytest.mark.parametrize("crispness", range(7))
+    def test_crispness_levels(self, temp_audio_file, tmp_path, crispness):
+        """Test that every crispness level can be used."""
+        output_path = tmp_path / "stretched.wav"
+
+        stretch_audio(temp_audio_file, output_path, ratio=1.25, crispness=crispness)
+
+        assert output_path.exists()
+
+
+@pytest.mark.usefixtures("rubberband_cli_only")
+class TestStretchAudioCliFallback:
+    """Tests for stretching through the rubberband CLI."""
+
+    def test_stretch_changes_duration(self, temp_audio_file, tmp_path):
+        """Test that the CLI stretches by 0.5 to roughly double duration."""
+        output_path = tmp_path / "out" / "stretched.wav"
+
+        stretch_audio(temp_audio_file, output_path, ratio=0.5)
+
+        actual_ratio = sf.info(output_path).duration / sf.info(temp_audio_file).duration
+        assert abs(actual_ratio - 2.0) < 0.2
+
+    def test_stretch_preserves_format(self, temp_stereo_file, tmp_path):
+        """Test that the CLI keeps sample rate, channels, and subtype."""
+        output_path = tmp_path / "stretched.wav"
+
+        stretch_audio(temp_stereo_file, output_path, ratio=0.8)
+
+        original_info = sf.info(temp_stereo_file)
+        stretched_info = sf.info(output_path)
+        assert stretched_info.samplerate == original_info.samplerate
+        assert stretched_info.channels == 2
+        assert stretched_info.subtype == original_info.subtype
+
+    @pytest.mark.parametrize("crispness", range(7))
+    def test_crispness_levels(self, temp_audio_file, tmp_path, crispness):
+        """Test that every crispness level is accepted by the CLI."""
+        output_path = tmp_path / "stretched.wav"
+
+        stretch_audio(temp_audio_file, output_path, ratio=1.25, crispness=crispness)
+
+        assert output_path.exists()
+
 
 class TestStretchToBpm:
     """Tests for BPM-to-BPM stretching."""
@@ -103,3 +184,71 @@ class TestStretchToBpm:
         actual_ratio = stretched_info.duration / original_info.duration
 
         assert abs(actual_ratio - expected_ratio) < 0.15
+
+
+class TestStretchArrayToBpm:
+    """Tests for stretching already-decoded audio."""
+
+    def test_same_bpm_writes_source_audio(self, temp_stereo_file, tmp_path):
+        """Test that an identity stretch writes the decoded audio unchanged."""
+        output_path = tmp_path / "out" / "stretched.wav"
+        audio = read_audio(temp_stereo_file)
+
+        stretch_array_to_bpm(audio, output_path, 120, 120)
+
+        assert sf.info(output_path).subtype == audio.subtype
+        assert (read_audio(output_path).samples == audio.samples).all()
+
+    @pytest.mark.parametrize("mono", [False, True])
+    def test_zero_frame_input(self, tmp_path, mono):
+        """Test that an empty input writes an empty output."""
+        input_path = tmp_path / "empty.wav"
+        sf.write(input_path, np.zeros((0, 2), dtype=np.float32), 44100)
+        output_path = tmp_path / "out.wav"
+
+        stretch_array_to_bpm(read_audio(input_path), output_path, 120, 120, mono=mono)
+
+        info = sf.info(output_path)
+        assert info.frames == 0
+        assert info.channels == (1 if mono else 2)
+
+    def test_container_follows_output_extension(self, temp_stereo_file, tmp_path):
+        """Test that the output container comes from the output extension."""
+        input_path = tmp_path / "input.flac"
+        sf.write(input_path, sf.read(temp_stereo_file)[0], 44100, subtype="PCM_16")
+
+        output_path = tmp_path / "out.wav"
+        stretch_array_to_bpm(read_audio(input_path), output_path, 120, 120)
+        assert sf.info(output_path).format == "WAV"
+
+        output_path = tmp_path / "out.unknown"
+        stretch_array_to_bpm(read_audio(input_path), output_path, 120, 120)
+        assert sf.info(output_path).format == "FLAC"
+
+    def test_applies_format_conversion(self, temp_stereo_file, tmp_path):
+        """Test that conversion options are applied to the single write."""
+        output_path = tmp_path / "converted.wav"
+
+        stretch_array_to_bpm(
+            read_audio(temp_stereo_file),
+            output_path,
+            120,
+            120,
+            sample_rate=22050,
+            bit_depth=24,
+            mono=True,
+        )
+
+        info = sf.info(output_path)
+        assert info.samplerate == 22050
+        assert info.channels == 1
+        assert info.subtype == "PCM_24"
+
+    def test_stretch_to_bpm(self, temp_audio_file, tmp_path):
+        """Test stretching decoded audio from one BPM to another."""
+        output_path = tmp_path / "stretched.wav"
+
+        stretch_array_to_bpm(read_audio(temp_audio_file), output_path, 120, 90)
+
+        actual_ratio = sf.info(output_path).duration / sf.info(temp_audio_file).duration
+        assert abs(actual_ratio - 120 / 90) < 0.15